@@ -1,6 +1,23 @@
+"""온실가스 배출량 보고서 생성 API
+
+프로파일링:
+    - EMIT_REPORT_PROFILE=1 로 실행하면 /generate-report 요청마다
+      create_emission_report 구간의 cProfile 결과를 임시 디렉토리의 emit-<uuid>.prof에 기록합니다.
+      (python -m pstats <경로> 또는 snakeviz로 확인)
+      동시에 들어온 요청은 한 번에 하나만 프로파일링하고, 나머지는 프로파일링 없이 처리합니다.
+    - 전체 프로세스 플레임그래프는 py-spy로 기록합니다:
+      py-spy record -o flame.svg -- python emission_report.py
+      (서버 실행 중 /generate-report 요청을 보낸 뒤 종료)
+"""
 import os
+import re
 import csv
+import logging
+import cProfile
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # 서버 환경용 비대화형 백엔드 (pyplot import 전에 지정)
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 from docx import Document
@@ -13,19 +30,29 @@ from docx.oxml import parse_xml
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 import io
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 import tempfile
-import shutil
+import threading
 import uuid
+from xml.sax.saxutils import escape
 
 from matplotlib import rc
+import urllib.parse
 import urllib.request
 import zipfile
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="온실가스 배출량 보고서 생성 API")
 
+# 프로파일링 설정 (EMIT_REPORT_PROFILE=1 일 때만 활성화)
+_PROFILE_ENABLED = os.getenv('EMIT_REPORT_PROFILE') == '1'
+_PROFILE_DIR = tempfile.gettempdir()
+# cProfile은 프로세스당 하나만 동시에 활성화할 수 있음 (Python 3.12+ sys.monitoring)
+_PROFILE_LOCK = threading.Lock()
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -52,53 +79,38 @@ class ReportRequest(BaseModel):
     word_chart1_csv: str
 
 def csv_string_to_dataframe(csv_string: str) -> pd.DataFrame:
-    """CSV 문자열을 pandas DataFrame으로 변환합니다."""
+    """CSV 문자열을 pandas DataFrame으로 변환합니다.
+
+    모든 값은 문자열로 읽으며(dtype=str), 숫자 변환은 safe_float_convert에서 처리합니다.
+    """
     if not csv_string.strip():
         return pd.DataFrame()
     
     try:
-        # pandas의 StringIO를 사용하여 더 안전하게 파싱
-        from io import StringIO
-        
-        # CSV 문자열을 pandas로 직접 읽기
-        df = pd.read_csv(StringIO(csv_string.strip()))
-        
-        return df
+        # C 엔진으로 직접 읽기 (컬럼별 타입 추론 및 NaN 변환 생략)
+        return pd.read_csv(io.StringIO(csv_string.strip()), engine='c', dtype=str, keep_default_na=False)
         
     except Exception as e:
-        print(f"CSV 파싱 오류: {str(e)}")
-        print(f"CSV 내용 (처음 500자): {csv_string[:500]}")
+        logger.warning("CSV 파싱 오류: %s", e)
+        logger.debug("CSV 내용 (처음 500자): %s", csv_string[:500])
         
-        # 수동 파싱으로 폴백
+        # python 엔진으로 폴백 (헤더보다 긴 행은 초과 컬럼을 잘라내고, 짧은 행은 빈 문자열로 채움)
         try:
-            lines = csv_string.strip().split('\n')
-            reader = csv.reader(lines)
-            data = list(reader)
-            
-            if not data:
-                return pd.DataFrame()
-            
-            # 첫 번째 행을 헤더로 사용
-            headers = data[0]
-            rows = data[1:]
-            
-            # 각 행의 컬럼 수를 헤더 컬럼 수에 맞춰 조정
-            normalized_rows = []
-            for row in rows:
-                if len(row) < len(headers):
-                    # 부족한 컬럼은 빈 문자열로 채움
-                    row.extend([''] * (len(headers) - len(row)))
-                elif len(row) > len(headers):
-                    # 초과하는 컬럼은 제거
-                    row = row[:len(headers)]
-                normalized_rows.append(row)
-            
-            return pd.DataFrame(normalized_rows, columns=headers)
+            cleaned = csv_string.strip()
+            n_cols = len(next(csv.reader(io.StringIO(cleaned))))
+            df = pd.read_csv(
+                io.StringIO(cleaned), engine='python', on_bad_lines=lambda bad: bad[:n_cols],
+                dtype=str, keep_default_na=False
+            )
+            return df.fillna('')
             
         except Exception as e2:
-            print(f"수동 CSV 파싱도 실패: {str(e2)}")
+            logger.error("python 엔진 CSV 파싱도 실패: %s", e2)
             return pd.DataFrame()
 
+# 숫자 문자열에서 제거할 문자 (쉼표, 따옴표)
+_DROP = str.maketrans('', '', ",\"'")
+
 def safe_float_convert(value):
     """문자열 값을 안전하게 float로 변환합니다."""
     if isinstance(value, (int, float)):
@@ -106,7 +118,7 @@ def safe_float_convert(value):
     
     if isinstance(value, str):
         # 쉼표 제거 및 따옴표 제거
-        cleaned_value = value.replace(',', '').replace('"', '').replace("'", "").strip()
+        cleaned_value = value.translate(_DROP).strip()
         
         # 빈 문자열이나 0.000인 경우
         if not cleaned_value or cleaned_value == '0.000':
@@ -119,40 +131,66 @@ def safe_float_convert(value):
     
     return 0.0
 
-def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
-    """요청 데이터를 바탕으로 필요한 변수들을 계산합니다."""
+def to_float_series(s: pd.Series) -> pd.Series:
+    """문자열 Series를 safe_float_convert와 같은 규칙으로 한 번에 float Series로 변환합니다."""
+    cleaned = (
+        s.astype(str)
+        .str.replace(',', '', regex=False)
+        .str.replace('"', '', regex=False)
+        .str.replace("'", '', regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0.0)
+
+def calculate_variables(request_data: ReportRequest) -> Tuple[Dict[str, Any], Dict[str, pd.DataFrame]]:
+    """요청 데이터를 바탕으로 필요한 변수들을 계산합니다.
+
+    각 테이블 CSV는 이곳에서 한 번만 파싱되며, 파싱된 DataFrame들은
+    보고서 생성 시 재사용할 수 있도록 변수와 함께 반환됩니다.
+    """
     
     try:
+        # 요청 필드는 함수 시작 시 한 번만 읽어 지역 변수로 사용
+        rd = request_data
+        table1_csv, table3_csv, table5_csv = rd.word_table1_csv, rd.word_table3_csv, rd.word_table5_csv
+        table2_csv, table4_csv, table6_csv = rd.word_table2_csv, rd.word_table4_csv, rd.word_table6_csv
+        report_sales, report_employees = rd.report_sales, rd.report_employees
+        report_sales_last_year, report_employees_last_year = rd.report_sales_last_year, rd.report_employees_last_year
+        
         # 기본 변수
-        company_name = request_data.company_name
-        report_year = int(request_data.selected_report_year)
-        base_year = int(request_data.base_year)
+        company_name = rd.company_name
+        report_year = int(rd.selected_report_year)
+        base_year = int(rd.base_year)
         previous_year = report_year - 1
         
         # Table3 데이터에서 사업장 수 계산
-        print("Table3 데이터 파싱 중...")
-        table3_df = csv_string_to_dataframe(request_data.word_table3_csv)
+        logger.debug("Table3 데이터 파싱 중...")
+        table3_df = csv_string_to_dataframe(table3_csv)
         workplace_num = len(table3_df) if not table3_df.empty else 0
-        print(f"사업장 수: {workplace_num}")
+        logger.debug("사업장 수: %s", workplace_num)
         
         # Table1 데이터에서 배출량 정보 추출
-        print("Table1 데이터 파싱 중...")
-        table1_df = csv_string_to_dataframe(request_data.word_table1_csv)
-        print(f"Table1 DataFrame shape: {table1_df.shape}")
-        print(f"Table1 columns: {table1_df.columns.tolist()}")
+        logger.debug("Table1 데이터 파싱 중...")
+        table1_df = csv_string_to_dataframe(table1_csv)
+        logger.debug("Table1 DataFrame shape: %s", table1_df.shape)
+        logger.debug("Table1 columns: %s", table1_df.columns.tolist())
         
         if table1_df.empty:
             raise ValueError("Table1 데이터가 비어있습니다.")
         
+        report_col = '보고대상연도 배출량(tCO2eq)'
+        gubun = table1_df['구분']
+        subtotal_mask = table1_df['세부구분'] == '합계'
+        
         # 총합 행 찾기
-        total_row = table1_df[table1_df['구분'] == '총합']
+        total_row = table1_df[gubun == '총합']
         if total_row.empty:
             raise ValueError("총합 행을 찾을 수 없습니다.")
         
         total_row = total_row.iloc[0]
         
         # 배출량 데이터 추출 및 변환
-        total_emission_report_year = safe_float_convert(total_row['보고대상연도 배출량(tCO2eq)'])
+        total_emission_report_year = safe_float_convert(total_row[report_col])
         total_emission_base_year = safe_float_convert(total_row['기준연도 배출량(tCO2eq)'])
         total_emission_previous_year = safe_float_convert(total_row['전년도 배출량(tCO2eq)'])
         
@@ -164,14 +202,15 @@ def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
             (total_emission_report_year / total_emission_previous_year * 100) if total_emission_previous_year != 0 else 0, 2
         )
         
-        # Scope별 배출량 추출
-        scope1_row = table1_df[(table1_df['구분'] == 'Scope 1') & (table1_df['세부구분'] == '합계')]
-        scope2_row = table1_df[(table1_df['구분'] == 'Scope 2') & (table1_df['세부구분'] == '합계')]
-        scope3_row = table1_df[(table1_df['구분'] == 'Scope 3') & (table1_df['세부구분'] == '합계')]
+        # Scope별 배출량 추출 (합계 행을 한 번만 골라 Scope별 첫 행을 사용)
+        scope_totals = {}
+        subtotal_rows = table1_df.loc[subtotal_mask]
+        for scope, value in zip(subtotal_rows['구분'], subtotal_rows[report_col]):
+            scope_totals.setdefault(scope, value)
         
-        scope1_emission_report_year = safe_float_convert(scope1_row.iloc[0]['보고대상연도 배출량(tCO2eq)']) if not scope1_row.empty else 0
-        scope2_emission_report_year = safe_float_convert(scope2_row.iloc[0]['보고대상연도 배출량(tCO2eq)']) if not scope2_row.empty else 0
-        scope3_emission_report_year = safe_float_convert(scope3_row.iloc[0]['보고대상연도 배출량(tCO2eq)']) if not scope3_row.empty else 0
+        scope1_emission_report_year = safe_float_convert(scope_totals['Scope 1']) if 'Scope 1' in scope_totals else 0
+        scope2_emission_report_year = safe_float_convert(scope_totals['Scope 2']) if 'Scope 2' in scope_totals else 0
+        scope3_emission_report_year = safe_float_convert(scope_totals['Scope 3']) if 'Scope 3' in scope_totals else 0
         
         # Scope별 비율 계산
         if total_emission_report_year != 0 and scope1_emission_report_year != 0:
@@ -200,17 +239,14 @@ def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
         # )
         
         # 최다 배출원 찾기 (Scope 1, 2에서)
-        scope1_2_data = table1_df[
-            (table1_df['구분'].isin(['Scope 1', 'Scope 2'])) & 
-            (table1_df['세부구분'] != '합계')
-        ].copy()
-        
-        if not scope1_2_data.empty:
-            scope1_2_data['emission_value'] = scope1_2_data['보고대상연도 배출량(tCO2eq)'].apply(safe_float_convert)
-            largest_source_row = scope1_2_data.loc[scope1_2_data['emission_value'].idxmax()]
+        scope1_2_mask = gubun.isin({'Scope 1', 'Scope 2'}) & ~subtotal_mask
+        
+        if scope1_2_mask.any():
+            emission_values = to_float_series(table1_df.loc[scope1_2_mask, report_col])
+            largest_idx = emission_values.idxmax()
             
-            name_largest_emission_source_report_year = largest_source_row['세부구분']
-            amount_largest_emission_source_report_year = largest_source_row['emission_value']
+            name_largest_emission_source_report_year = table1_df.at[largest_idx, '세부구분']
+            amount_largest_emission_source_report_year = emission_values[largest_idx]
             rate_largest_emission_source_report_year = round(
                 (amount_largest_emission_source_report_year / total_emission_report_year * 100) if total_emission_report_year != 0 else 0, 2
             )
@@ -220,49 +256,38 @@ def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
             rate_largest_emission_source_report_year = 0
         
         # 최다 배출 사업장 (Table5에서 추출)
-        print("Table5 데이터 파싱 중...")
-        table5_df = csv_string_to_dataframe(request_data.word_table5_csv)
-        print(f"Table5 DataFrame shape: {table5_df.shape}")
-        
-        if not table5_df.empty:
-            total_row_table5 = table5_df[table5_df['구분'] == '총합계']
-            if not total_row_table5.empty:
-                total_row_table5 = total_row_table5.iloc[0]
-                workplace_columns = [col for col in table5_df.columns if col not in ['구분', '세부구분', '합계']]
-                workplace_emissions = {}
-                
-                for col in workplace_columns:
-                    try:
-                        emission_value = safe_float_convert(total_row_table5[col])
-                        workplace_emissions[col] = emission_value
-                    except:
-                        workplace_emissions[col] = 0
-                
-                if workplace_emissions:
-                    largest_workplace = max(workplace_emissions.items(), key=lambda x: x[1])
-                    name_largest_emission_workplace_report_year = largest_workplace[0]
-                    amount_largest_emission_workplace_report_year = largest_workplace[1]
-                    rate_largest_emission_workplace_report_year = round(
-                        (amount_largest_emission_workplace_report_year / total_emission_report_year * 100) if total_emission_report_year != 0 else 0, 2
-                    )
-                else:
-                    name_largest_emission_workplace_report_year = "N/A"
-                    amount_largest_emission_workplace_report_year = 0
-                    rate_largest_emission_workplace_report_year = 0
-            else:
-                name_largest_emission_workplace_report_year = "N/A"
-                amount_largest_emission_workplace_report_year = 0
-                rate_largest_emission_workplace_report_year = 0
+        logger.debug("Table5 데이터 파싱 중...")
+        table5_df = csv_string_to_dataframe(table5_csv)
+        logger.debug("Table5 DataFrame shape: %s", table5_df.shape)
+        
+        total_row_table5 = table5_df[table5_df['구분'] == '총합계'] if not table5_df.empty else table5_df
+        workplace_columns = [col for col in table5_df.columns if col not in ['구분', '세부구분', '합계']]
+        
+        if not total_row_table5.empty and workplace_columns:
+            total_row_table5 = total_row_table5.iloc[0]
+            row_vals = np.array([safe_float_convert(total_row_table5[col]) for col in workplace_columns])
+            largest_pos = int(row_vals.argmax())
+            
+            name_largest_emission_workplace_report_year = workplace_columns[largest_pos]
+            amount_largest_emission_workplace_report_year = float(row_vals[largest_pos])
+            rate_largest_emission_workplace_report_year = round(
+                (amount_largest_emission_workplace_report_year / total_emission_report_year * 100) if total_emission_report_year != 0 else 0, 2
+            )
         else:
             name_largest_emission_workplace_report_year = "N/A"
             amount_largest_emission_workplace_report_year = 0
             rate_largest_emission_workplace_report_year = 0
         
+        # 보고서 본문용 나머지 테이블 파싱
+        table2_df = csv_string_to_dataframe(table2_csv)
+        table4_df = csv_string_to_dataframe(table4_csv)
+        table6_df = csv_string_to_dataframe(table6_csv)
+        
         # 매출액 및 임직원수 관련 계산
-        revenue_report_year = safe_float_convert(request_data.report_sales)
-        num_employee_report_year = int(safe_float_convert(request_data.report_employees))
-        revenue_previous_year = safe_float_convert(request_data.report_sales_last_year)
-        num_employee_previous_year = int(safe_float_convert(request_data.report_employees_last_year))
+        revenue_report_year = safe_float_convert(report_sales)
+        num_employee_report_year = int(safe_float_convert(report_employees))
+        revenue_previous_year = safe_float_convert(report_sales_last_year)
+        num_employee_previous_year = int(safe_float_convert(report_employees_last_year))
         
         emission_vs_revenue_report_year = round(
             (total_emission_report_year / revenue_report_year) if revenue_report_year != 0 else 0, 4
@@ -277,7 +302,7 @@ def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
             (total_emission_previous_year / num_employee_previous_year) if num_employee_previous_year != 0 else 0, 2
         )
         
-        return {
+        variables = {
             'company_name': company_name,
             'workplace_num': workplace_num,
             'report_year': report_year,
@@ -309,13 +334,43 @@ def calculate_variables(request_data: ReportRequest) -> Dict[str, Any]:
             'emission_vs_revenue_previous_year': emission_vs_revenue_previous_year,
             'emission_vs_employee_previous_year': emission_vs_employee_previous_year
         }
+        
+        dataframes = {
+            'table1': table1_df,
+            'table2': table2_df,
+            'table3': table3_df,
+            'table4': table4_df,
+            'table5': table5_df,
+            'table6': table6_df
+        }
+        
+        return variables, dataframes
     
     except Exception as e:
-        print(f"calculate_variables에서 오류 발생: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("calculate_variables에서 오류 발생: %s", e)
         raise e
 
+# 테이블 셀 서식 템플릿 (9pt, 가운데 정렬 / 헤더는 굵게)
+_HEADER_RPR = '<w:rPr><w:b/><w:sz w:val="18"/></w:rPr>'
+_BODY_RPR = '<w:rPr><w:sz w:val="18"/></w:rPr>'
+
+def _cell_paragraph_xml(text: str, rpr: str) -> str:
+    """셀에 들어갈 가운데 정렬 단락 XML을 생성합니다. (줄바꿈/탭은 w:br/w:tab으로 변환)"""
+    content = '<w:br/>'.join(
+        '<w:tab/>'.join(
+            f'<w:t xml:space="preserve">{escape(part)}</w:t>' if part else ''
+            for part in line.split('\t')
+        )
+        for line in text.split('\n')
+    )
+    return f'<w:p {nsdecls("w")}><w:pPr><w:jc w:val="center"/></w:pPr><w:r>{rpr}{content}</w:r></w:p>'
+
+def _set_cell_xml(tc, text: str, rpr: str):
+    """python-docx 객체를 거치지 않고 셀(w:tc)의 내용을 직접 교체합니다."""
+    for p in tc.p_lst:
+        tc.remove(p)
+    tc.append(parse_xml(_cell_paragraph_xml(text, rpr)))
+
 def add_table_from_dataframe(document, df: pd.DataFrame):
     """DataFrame을 워드 문서에 테이블로 추가합니다."""
     if df.empty:
@@ -324,102 +379,109 @@ def add_table_from_dataframe(document, df: pd.DataFrame):
     # 테이블 생성 (헤더 포함)
     table = document.add_table(rows=len(df) + 1, cols=len(df.columns))
     table.style = 'Table Grid'
+    rows = table._tbl.tr_lst
     
     # 헤더 추가
-    for j, column_name in enumerate(df.columns):
-        cell = table.cell(0, j)
-        cell.text = str(column_name)
-        # 셀 정렬 설정
-        for paragraph in cell.paragraphs:
-            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            for run in paragraph.runs:
-                run.font.size = Pt(9)
-                run.font.bold = True
+    for tc, column_name in zip(rows[0].tc_lst, df.columns):
+        _set_cell_xml(tc, str(column_name), _HEADER_RPR)
     
     # 데이터 추가
-    for i, row in df.iterrows():
-        for j, value in enumerate(row):
-            cell = table.cell(i + 1, j)
-            cell.text = str(value) if pd.notna(value) else ""
-            # 셀 정렬 설정
-            for paragraph in cell.paragraphs:
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                for run in paragraph.runs:
-                    run.font.size = Pt(9)
+    for i, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        for tc, value in zip(rows[i].tc_lst, row):
+            text = '' if value is None or (isinstance(value, float) and value != value) else str(value)
+            _set_cell_xml(tc, text, _BODY_RPR)
     
     document.add_paragraph()  # 테이블 후 빈 줄 추가
 
+# 한글 폰트 탐색 설정
+_KOREAN_FONT_PATH = '/usr/share/fonts/korean/NanumGothic.ttf'
+# 파일명에 포함된 이름 기준 선호 순서 (고딕 계열 우선, 명조/펜/붓 등 기타 Nanum 폰트는 후순위)
+_KOREAN_FONT_PREFERENCE = (
+    'NanumGothic', 'AppleGothic', 'Malgun', 'NanumBarunGothic', 'NanumSquare', 'Dotum',
+    'NanumMyeongjo', 'Batang', 'Nanum'
+)
+_KFONT_RE = re.compile('|'.join(_KOREAN_FONT_PREFERENCE))
+
+def find_korean_font_path():
+    """한글 폰트 파일 경로를 찾습니다. (기본 경로 우선, 없으면 시스템 폰트 파일명에서 검색)
+
+    findSystemFonts의 반환 순서는 실행마다 달라질 수 있으므로,
+    선호 순서와 파일명으로 정렬해 항상 같은 폰트를 선택합니다.
+    """
+    if os.path.exists(_KOREAN_FONT_PATH):
+        return _KOREAN_FONT_PATH
+    
+    candidates = []
+    for font_path in fm.findSystemFonts(fontext='ttf'):
+        font_file = os.path.basename(font_path)
+        match = _KFONT_RE.search(font_file)
+        if match:
+            candidates.append((_KOREAN_FONT_PREFERENCE.index(match.group()), font_file, font_path))
+    
+    return min(candidates)[2] if candidates else None
+
 def setup_korean_font():
-    """서버 환경에서 한글 폰트를 직접 경로로 설정합니다."""
+    """서버 환경에서 한글 폰트를 찾아 matplotlib 기본 폰트로 설정합니다."""
     try:
-        # 직접 폰트 파일 경로 지정
-        font_path = '/usr/share/fonts/korean/NanumGothic.ttf'
+        font_path = find_korean_font_path()
         
-        if os.path.exists(font_path):
-            print(f"폰트 파일 발견: {font_path}")
+        if font_path:
+            logger.debug("폰트 파일 발견: %s", font_path)
             
-            # matplotlib에 폰트 직접 등록
+            # matplotlib에 폰트 직접 등록 후, 파일에서 읽은 폰트 이름으로 설정
             fm.fontManager.addfont(font_path)
+            font_name = fm.FontProperties(fname=font_path).get_name()
+            plt.rcParams['font.family'] = font_name
             
-            # 폰트 이름으로 설정 (여러 방법 시도)
-            font_names_to_try = ['NanumGothic', '나눔고딕', 'Nanum Gothic']
-            
-            for font_name in font_names_to_try:
-                try:
-                    plt.rcParams['font.family'] = font_name
-                    print(f"폰트 설정 시도: {font_name}")
-                    
-                    # 간단한 테스트
-                    fig, ax = plt.subplots(figsize=(1, 1))
-                    ax.text(0.5, 0.5, '한글', ha='center', va='center')
-                    plt.close(fig)
-                    
-                    print(f"한글 폰트 설정 성공: {font_name}")
-                    return True
-                except:
-                    continue
-            
-            # 폰트 이름이 안 되면 직접 폰트 속성 사용
-            try:
-                font_prop = fm.FontProperties(fname=font_path)
-                plt.rcParams['font.family'] = font_prop.get_name()
-                print(f"직접 경로로 폰트 설정 성공: {font_prop.get_name()}")
-                return True
-            except Exception as e:
-                print(f"직접 경로 설정 실패: {e}")
-        
-        print("한글 폰트 파일을 찾을 수 없습니다.")
+            logger.info("한글 폰트 설정 성공: %s", font_name)
+            return True
+        
+        logger.warning("한글 폰트 파일을 찾을 수 없습니다.")
         return False
         
     except Exception as e:
-        print(f"폰트 설정 중 오류: {e}")
+        logger.warning("폰트 설정 중 오류: %s", e)
         return False
 
+# 한글 폰트는 모듈 로드 시 한 번만 설정
+_KOREAN_FONT_AVAILABLE = setup_korean_font()
+
+if not _KOREAN_FONT_AVAILABLE:
+    logger.info("한글 폰트 없음, 영어 차트로 생성합니다.")
+    plt.rcParams['font.family'] = 'DejaVu Sans'
+
+# minus 폰트 문제 해결
+plt.rcParams['axes.unicode_minus'] = False
+
+# 차트용 Figure를 재사용 (matplotlib은 스레드 안전하지 않으므로 Lock으로 보호)
+_FIG, _AX = plt.subplots(figsize=(10, 7))
+_CHART_LOCK = threading.Lock()
+
+# 첫 요청 지연을 줄이기 위해 Agg 렌더러와 폰트 글리프 캐시를 모듈 로드 시 미리 초기화
+_AX.set_title('배출량 (tCO2eq) 0123456789' if _KOREAN_FONT_AVAILABLE else 'Emissions (tCO2eq) 0123456789')
+_FIG.canvas.draw()
+_AX.clear()
+
 def create_emission_chart_robust(chart1_csv: str, temp_dir: str):
     """견고한 차트 생성 함수 - 한글/영어 자동 선택"""
     try:
-        # 한글 폰트 설정 시도
-        korean_font_available = setup_korean_font()
-        
-        if not korean_font_available:
-            print("한글 폰트 없음, 영어 차트로 생성합니다.")
-            plt.rcParams['font.family'] = 'DejaVu Sans'
-        
-        # minus 폰트 문제 해결
-        plt.rcParams['axes.unicode_minus'] = False
+        korean_font_available = _KOREAN_FONT_AVAILABLE
         
         # Chart1 CSV 데이터 파싱
         df = csv_string_to_dataframe(chart1_csv)
         
         if df.empty:
-            print("차트 데이터가 비어있습니다.")
+            logger.warning("차트 데이터가 비어있습니다.")
             return None
         
         # 데이터 준비
         scopes = df.iloc[:, 0].tolist()
-        base_year_data = [safe_float_convert(x) for x in df.iloc[:, 1].tolist()]
-        previous_year_data = [safe_float_convert(x) for x in df.iloc[:, 2].tolist()]
-        report_year_data = [safe_float_convert(x) for x in df.iloc[:, 3].tolist()]
+        base_year_data = to_float_series(df.iloc[:, 1]).to_numpy()
+        previous_year_data = to_float_series(df.iloc[:, 2]).to_numpy()
+        report_year_data = to_float_series(df.iloc[:, 3]).to_numpy()
+        
+        # (Scope × 연도) 행렬
+        data_mat = np.array([base_year_data, previous_year_data, report_year_data]).T
         
         # 한글/영어 레이블 선택
         if korean_font_available:
@@ -433,84 +495,65 @@ def create_emission_chart_robust(chart1_csv: str, temp_dir: str):
             ylabel = 'Emissions (tCO2eq)'
             year_labels = ['Base Year', 'Previous Year', 'Report Year']
         
-        # 차트 생성
-        fig, ax = plt.subplots(figsize=(10, 7))
-        
-        # x축 위치 설정
-        x = [0, 1, 2]
-        width = 0.3
-        
-        # 색상 및 레이블 설정
-        colors = ['#2E86AB', '#A23B72', '#F18F01']
-        scope_labels = ['Scope 1', 'Scope 2', 'Scope 3']
+        with _CHART_LOCK:
+            # 공유 Figure 초기화 후 차트 생성
+            fig, ax = _FIG, _AX
+            ax.clear()
+            
+            # x축 위치 설정
+            x = [0, 1, 2]
+            width = 0.3
+            
+            # 색상 및 레이블 설정
+            colors = ['#2E86AB', '#A23B72', '#F18F01']
+            scope_labels = ['Scope 1', 'Scope 2', 'Scope 3']
+            
+            # 누적 막대 차트 생성 (Scope별로 세 연도를 한 번에 그림, 데이터에 있는 Scope만)
+            bottom = np.zeros(len(x))
+            for scope_values, color, label in zip(data_mat, colors, scope_labels):
+                ax.bar(x, scope_values, width, bottom=bottom, label=label, color=color, alpha=0.8)
+                bottom = bottom + scope_values
+            
+            # 축 레이블 및 제목 설정
+            ax.set_xlabel(xlabel, fontsize=12, fontweight='bold')
+            ax.set_ylabel(ylabel, fontsize=12, fontweight='bold')
+            ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+            
+            # x축 눈금 설정
+            ax.set_xticks(x)
+            ax.set_xticklabels(year_labels)
+            
+            # 범례 설정
+            ax.legend(loc='upper right', fontsize=10)
+            
+            # 그리드 추가
+            ax.grid(True, axis='y', alpha=0.3)
+            
+            # y축 범위 설정
+            year_totals = data_mat.sum(axis=0)
+            max_total = year_totals.max()
+            if max_total > 0:
+                ax.set_ylim(0, max_total * 1.1)
+            
+            # 막대 위에 값 표시
+            for i, total in enumerate(year_totals):
+                if total > 0:
+                    ax.text(i, total + max_total * 0.02, f'{total:,.0f}', 
+                           ha='center', va='bottom', fontsize=10, fontweight='bold')
+            
+            # 레이아웃 조정
+            fig.tight_layout()
+            
+            # 차트 저장
+            # 문서에는 6인치 폭으로 삽입되므로 150 DPI로 충분하며, PNG는 빠른 압축 수준으로 저장
+            chart_path = os.path.join(temp_dir, 'Chart1.png')
+            fig.savefig(chart_path, dpi=150, bbox_inches='tight', facecolor='white', pil_kwargs={'compress_level': 1})
         
-        # 누적 막대 차트 생성
-        # 기준연도
-        bottom_base = 0
-        for i, (data, color, label) in enumerate(zip(base_year_data, colors, scope_labels)):
-            if i == 0:
-                ax.bar(x[0], data, width, label=label, color=color, alpha=0.8)
-            else:
-                ax.bar(x[0], data, width, bottom=bottom_base, label=label, color=color, alpha=0.8)
-            bottom_base += data
-        
-        # 전년도
-        bottom_prev = 0
-        for i, (data, color) in enumerate(zip(previous_year_data, colors)):
-            ax.bar(x[1], data, width, bottom=bottom_prev, color=color, alpha=0.8)
-            bottom_prev += data
-        
-        # 보고대상연도
-        bottom_report = 0
-        for i, (data, color) in enumerate(zip(report_year_data, colors)):
-            ax.bar(x[2], data, width, bottom=bottom_report, color=color, alpha=0.8)
-            bottom_report += data
-        
-        # 축 레이블 및 제목 설정
-        ax.set_xlabel(xlabel, fontsize=12, fontweight='bold')
-        ax.set_ylabel(ylabel, fontsize=12, fontweight='bold')
-        ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
-        
-        # x축 눈금 설정
-        ax.set_xticks(x)
-        ax.set_xticklabels(year_labels)
-        
-        # 범례 설정
-        ax.legend(loc='upper right', fontsize=10)
-        
-        # 그리드 추가
-        ax.grid(True, axis='y', alpha=0.3)
-        
-        # y축 범위 설정
-        max_total = max([
-            sum(base_year_data),
-            sum(previous_year_data),
-            sum(report_year_data)
-        ])
-        if max_total > 0:
-            ax.set_ylim(0, max_total * 1.1)
-        
-        # 막대 위에 값 표시
-        year_totals = [sum(base_year_data), sum(previous_year_data), sum(report_year_data)]
-        for i, total in enumerate(year_totals):
-            if total > 0:
-                ax.text(i, total + max_total * 0.02, f'{total:,.0f}', 
-                       ha='center', va='bottom', fontsize=10, fontweight='bold')
-        
-        # 레이아웃 조정
-        plt.tight_layout()
-        
-        # 차트 저장
-        chart_path = os.path.join(temp_dir, 'Chart1.png')
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight', facecolor='white')
-        plt.close()
-        
-        print("차트가 성공적으로 생성되었습니다.")
+        logger.debug("차트가 성공적으로 생성되었습니다.")
         return chart_path
         
     except Exception as e:
-        print(f"차트 생성 중 오류가 발생했습니다: {str(e)}")
-        plt.close()
+        logger.exception("차트 생성 중 오류가 발생했습니다: %s", e)
         return None
 
 # def create_emission_chart(chart1_csv: str, temp_dir: str):
@@ -614,8 +657,8 @@ def create_emission_chart_robust(chart1_csv: str, temp_dir: str):
 #         print(f"차트 생성 중 오류가 발생했습니다: {str(e)}")
 #         return None
 
-def create_emission_report(variables: Dict[str, Any], request_data: ReportRequest, temp_dir: str):
-    """온실가스 배출량 보고서를 생성합니다."""
+def _build_report_skeleton() -> bytes:
+    """보고서의 정적인 골격(페이지 여백, 표지 로고)을 만들어 직렬화합니다."""
     doc = Document()
     
     # 페이지 여백 설정
@@ -633,6 +676,17 @@ def create_emission_report(variables: Dict[str, Any], request_data: ReportReques
         last_paragraph = doc.paragraphs[-1]
         last_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
     
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+# 보고서 골격은 모듈 로드 시 한 번만 생성하고, 요청마다 이 바이트에서 문서를 엽니다.
+_REPORT_SKELETON = _build_report_skeleton()
+
+def create_emission_report(variables: Dict[str, Any], dataframes: Dict[str, pd.DataFrame], request_data: ReportRequest, temp_dir: str):
+    """온실가스 배출량 보고서를 생성합니다."""
+    doc = Document(io.BytesIO(_REPORT_SKELETON))
+    
     # 제목 추가
     title_paragraph = doc.add_paragraph()
     title_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
@@ -677,8 +731,7 @@ def create_emission_report(variables: Dict[str, Any], request_data: ReportReques
     
     # Sub Section 1-3
     doc.add_heading('전체 배출량', level=2)
-    table1_df = csv_string_to_dataframe(request_data.word_table1_csv)
-    add_table_from_dataframe(doc, table1_df)
+    add_table_from_dataframe(doc, dataframes['table1'])
     
     # Sub Section 1-4
     doc.add_heading('배출량 추이', level=2)
@@ -709,73 +762,86 @@ def create_emission_report(variables: Dict[str, Any], request_data: ReportReques
     gas_text = """보고 대상 온실가스는 ⌜기후위기 대응을 위한 탄소중립∙녹색성장 기본법⌟상 6대 온실가스(CO2, CH4, N2O, HFCs, PFCs, SF6)입니다. 지구온난화지수(GWP)는 ⌜온실가스 배출권거래제의 배출량 보고 및 인증에 관한 지침⌟에 따라 IPCC 2차 보고서의 값(SAR)을 적용하였습니다."""
     doc.add_paragraph(gas_text)
     
-    table2_df = csv_string_to_dataframe(request_data.word_table2_csv)
-    add_table_from_dataframe(doc, table2_df)
+    add_table_from_dataframe(doc, dataframes['table2'])
     
     # Sub Section 2-4
     doc.add_heading('4. 조직 경계', level=2)
     boundary_text = f"{variables['company_name']} 내에서 총 {variables['workplace_num']}개 사업장을 대상으로 온실가스 배출량을 측정하였으며, 각 사업장의 조직 경계는 아래 표와 같습니다."
     doc.add_paragraph(boundary_text)
     
-    table3_df = csv_string_to_dataframe(request_data.word_table3_csv)
-    add_table_from_dataframe(doc, table3_df)
+    add_table_from_dataframe(doc, dataframes['table3'])
     
     # Sub Section 2-5
     doc.add_heading('5. 운영 경계', level=2)
     operation_text = f"운영 경계에 따라 {variables['company_name']}의 배출원은 직접 배출/흡수량(Scope 1), 에너지 간접 배출량(Scope 2) 및 그 밖의 간접 배출량(Scope 3)으로 분류되었으며, 세부적인 내용은 다음과 같습니다."
     doc.add_paragraph(operation_text)
     
-    table4_df = csv_string_to_dataframe(request_data.word_table4_csv)
-    add_table_from_dataframe(doc, table4_df)
+    add_table_from_dataframe(doc, dataframes['table4'])
     
     # Sub Section 2-6
     doc.add_heading('6. 사업장별 온실가스 배출량', level=2)
     workplace_text = "각 사업장별 온실가스 배출량은 다음과 같습니다.\n\n(단위: tCO2eq)"
     doc.add_paragraph(workplace_text)
     
-    table5_df = csv_string_to_dataframe(request_data.word_table5_csv)
-    add_table_from_dataframe(doc, table5_df)
+    add_table_from_dataframe(doc, dataframes['table5'])
     
     # Sub Section 2-7
     doc.add_heading('7. Scope별 온실가스 배출량', level=2)
     scope_detail_text = "각 Scope별 온실가스 배출량은 다음과 같습니다."
     doc.add_paragraph(scope_detail_text)
     
-    table6_df = csv_string_to_dataframe(request_data.word_table6_csv)
-    add_table_from_dataframe(doc, table6_df)
+    add_table_from_dataframe(doc, dataframes['table6'])
     
     return doc
 
+def _create_emission_report_profiled(variables: Dict[str, Any], dataframes: Dict[str, pd.DataFrame], request_data: ReportRequest, temp_dir: str):
+    """create_emission_report를 cProfile로 실행하고 결과를 요청별 파일에 기록합니다."""
+    # 다른 요청이 프로파일링 중이면 프로파일링 없이 생성
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        return create_emission_report(variables, dataframes, request_data, temp_dir)
+    
+    try:
+        prof = cProfile.Profile()
+        doc = prof.runcall(create_emission_report, variables, dataframes, request_data, temp_dir)
+        profile_path = os.path.join(_PROFILE_DIR, f'emit-{uuid.uuid4().hex}.prof')
+        prof.dump_stats(profile_path)
+        logger.info("프로파일 결과 저장: %s", profile_path)
+        return doc
+    finally:
+        _PROFILE_LOCK.release()
+
 @app.post("/generate-report")
-async def generate_report(request: ReportRequest):
-    """온실가스 배출량 보고서를 생성하고 파일을 반환합니다."""
-    temp_dir = None
+def generate_report(request: ReportRequest):
+    """온실가스 배출량 보고서를 생성하고 파일을 반환합니다.
+
+    CPU 작업(pandas, matplotlib, python-docx)이 이벤트 루프를 막지 않도록
+    동기 함수로 선언하여 FastAPI 스레드풀에서 실행되게 합니다.
+    """
     try:
-        # 임시 디렉토리 생성
-        temp_dir = tempfile.mkdtemp()
-        
-        # 변수 계산
-        variables = calculate_variables(request)
-        
-        # 보고서 생성
-        doc = create_emission_report(variables, request, temp_dir)
-        
-        # 파일 저장
-        filename = f"{variables['report_year']}년_온실가스_배출량_보고서.docx"
-        file_path = os.path.join(temp_dir, filename)
-        doc.save(file_path)
+        # 차트 이미지용 임시 디렉토리 (블록을 벗어나면 자동 삭제)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 변수 계산
+            variables, dataframes = calculate_variables(request)
+            
+            # 보고서 생성
+            if _PROFILE_ENABLED:
+                doc = _create_emission_report_profiled(variables, dataframes, request, temp_dir)
+            else:
+                doc = create_emission_report(variables, dataframes, request, temp_dir)
+            
+            # 메모리에 저장
+            buffer = io.BytesIO()
+            doc.save(buffer)
         
         # 파일 반환
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        filename = f"{variables['report_year']}년_온실가스_배출량_보고서.docx"
+        return Response(
+            content=buffer.getvalue(),
+            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            headers={'Content-Disposition': f"attachment; filename*=utf-8''{urllib.parse.quote(filename)}"}
         )
         
     except Exception as e:
-        # 에러 발생 시 임시 디렉토리 정리
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"보고서 생성 중 오류가 발생했습니다: {str(e)}")
 
 @app.get("/")